@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import pathlib
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEBUG_URL = os.environ.get("MMD_DEBUG_URL")
+
+_CONNECTION_ERROR = (
+    "Error: The requested resource could not be reached. "
+    "Please, make sure the url is correct and/or the destination is still reachable"
+)
+# https://requests.readthedocs.io/en/master/api/#exceptions
+#  checked in order, the first matching class is used
+_REQUEST_ERRORS = {
+    # will also catch both ConnectTimeout and ReadTimeout
+    requests.exceptions.Timeout: "Timeout: The request timed out while waiting for the server to respond",
+    # a 4XX client error or 5XX server error, potentially raised by raise_for_status
+    requests.exceptions.ConnectionError: _CONNECTION_ERROR,
+    requests.exceptions.HTTPError: _CONNECTION_ERROR,
+    # badly configured server?
+    requests.exceptions.TooManyRedirects: "Error: The request exceeded the number of maximum redirections",
+    # the server kept responding with one of the retried 5XX errors
+    requests.exceptions.RetryError: "All download attempts have failed, aborting",
+}
+
+
+class Forge:
+    # TODO: Move the download/requests bit to separate class, which
+    #  the Forge and Mod classes can inherit
+    def __init__(self, session: requests.Session, path: pathlib.Path, minecraft: str, forge: str):
+        """
+        Generate the url to download Forge from, and
+         attempt to download it using the requests module
+
+        :param session:     The shared requests session
+        :param path:        Path to download Forge to
+        :param minecraft:   Required minecraft version
+        :param forge:       Required Forge version
+        """
+        self.version = f"{minecraft}-{forge}"
+        self.jar = f"forge-{self.version}-installer.jar"
+        self.url_base = "https://files.minecraftforge.net/maven/net/minecraftforge/forge"
+        self.url_full = self.generate_url()
+        self.session = session
+        self.path = path
+        self.path_full = path.joinpath(self.jar)
+        # downloads go here first, and are only moved to path_full once they are verified
+        self.path_part = path.joinpath(f"{self.jar}.part")
+
+    def generate_url(self) -> str:
+        """
+        The url generator
+
+        :return:    The url
+        """
+        url = f"{self.url_base}/{self.version}/{self.jar}"
+        return url
+
+    def download(self, retry: bool = True) -> None:
+        """
+        The main download action
+
+        :param retry:   Download the file once more if writing or the checksum fails
+        :return:        Nothing
+        """
+        # For testing, override the url through the environment, eg
+        #  MMD_DEBUG_URL=https://httpbin.org/status/503
+        if DEBUG_URL:
+            self.url_full = DEBUG_URL
+
+        # The jar itself only ever appears once it has been verified, so an existing one is kept if it still matches
+        if self.path_full.exists():
+            sha1 = hashlib.sha1()
+            self.hash_existing(self.path_full, sha1)
+            if self.verify(self.path_full, sha1, self.path_full.stat().st_size):
+                print("File was already completely downloaded")
+                return
+            self.path_full.unlink()
+
+        # An existing .part file is a previous download which didn't finish, try to resume it
+        offset = 0
+        if self.path_part.exists():
+            offset = self.path_part.stat().st_size
+            print(f"A partial download already exists at the specified location, resuming from {offset} bytes")
+
+        print(f"Downlading {self.jar} to: {self.path}")
+        print(self.url_full)
+        # Retrying on 5XX errors is handled by the session, see create_session
+        response = self.handle_request(offset)
+        if response is None:
+            return
+        status = response.status_code
+        sha1 = hashlib.sha1()
+        size = None
+        confirm = False
+
+        if status == requests.codes.range_not_satisfiable:
+            # the server reports the size of the remote file as "bytes */N"
+            remote_size = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if remote_size != str(offset):
+                print("The partial download doesn't match the remote file, downloading it again")
+                response.close()
+                self.path_part.unlink()
+                self.download(retry)
+                return
+            # A preallocated file left behind by a killed run has the full size as well,
+            #  so only a matching checksum can tell if it is actually complete
+            self.hash_existing(self.path_part, sha1)
+            size = offset
+            confirm = True
+        elif status in (requests.codes.ok, requests.codes.partial_content):
+            if status == requests.codes.ok:
+                # the server ignored the range and sent the whole file, start over
+                offset = 0
+            elif offset:
+                self.hash_existing(self.path_part, sha1)
+            length = 0
+            encoded = "Content-Encoding" in response.headers
+            if not encoded:
+                length = int(response.headers.get("Content-Length", 0))
+            # in case the server ignores the identity encoding, let urllib3 decode the data
+            response.raw.decode_content = True
+            size = self.write_to_disk(response.raw, sha1, length, offset, encoded)
+            if size is None:
+                # the file was truncated to what was actually written, so the retry resumes from there
+                response.close()
+                if retry:
+                    print("Retrying...")
+                    self.download(retry=False)
+                return
+            print("File succesfully downloaded")
+
+        response.close()
+        if size is None:
+            return
+
+        if not self.verify(self.path_part, sha1, size, confirm):
+            self.path_part.unlink()
+            if retry:
+                print("Retrying...")
+                self.download(retry=False)
+            return
+        os.replace(self.path_part, self.path_full)
+
+    def handle_request(self, offset: int = 0) -> Optional[requests.Response]:
+        """
+        Make the get request, and
+         attempt to handle errors somewhat nicely
+
+        :param offset:  Amount of bytes already downloaded, to resume from
+        :return:        The request response, or None if the request failed
+        """
+        # The jar is already zip compressed, asking for gzip on top of that only wastes cpu time,
+        #  and byte ranges only line up with the file on disk if the data isn't encoded
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        try:
+            response = self.session.get(self.url_full, headers=headers, stream=True, timeout=10)
+            # a 416 means the range is past the end of the remote file, which is handled by the caller
+            if response.status_code != requests.codes.range_not_satisfiable:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            message = next(
+                (msg for cls, msg in _REQUEST_ERRORS.items() if isinstance(e, cls)),
+                "Encountered an ambiguous error, you're on your own now"
+            )
+            print(f"{message}\n{e}")
+            if e.response is not None:
+                # release the connection of the streamed response back to the pool
+                e.response.close()
+            return None
+
+        return response
+
+    def write_to_disk(self, raw_data, sha1, length: int = 0, offset: int = 0, encoded: bool = False) -> Optional[int]:
+        """
+        Write the raw data to the .part file, and
+         preallocate the file if the final size is known, and
+         update the hash with the data while it is being written
+
+        :param raw_data:    The raw data
+        :param sha1:        The hash object to update
+        :param length:      The expected size in bytes, 0 if unknown
+        :param offset:      Append to the existing file from this many bytes, 0 to overwrite it
+        :param encoded:     If the data is compressed and will be decoded while reading
+        :return:            The size of the file, or None if writing failed
+        """
+        # Reuse a single 1 MiB buffer instead of copyfileobj's small default chunks,
+        #  the file is unbuffered since every write is already a large block
+        buffer = memoryview(bytearray(1 << 20))
+        written = offset
+        try:
+            with open(self.path_part, "ab" if offset else "wb", buffering=0) as file:
+                # Only preallocate fresh files, appended writes would land after the reserved space
+                if length and not offset and hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(file.fileno(), 0, length)
+                    except OSError:
+                        # not supported by every filesystem, the writes will just grow the file
+                        pass
+                while True:
+                    if encoded:
+                        # urllib3 1.x can decode to more data than was asked for, which won't fit in the buffer
+                        data = raw_data.read(len(buffer))
+                    else:
+                        data = buffer[:raw_data.readinto(buffer)]
+                    if not data:
+                        break
+                    sha1.update(data)
+                    file.write(data)
+                    written += len(data)
+                # urllib3 1.x doesn't complain when the connection closes before Content-Length was reached
+                if length and written - offset != length:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"Connection closed after {written - offset} of {length} bytes"
+                    )
+        except BaseException as e:
+            # Drop any preallocated or half written data, so the
+            #  file size is what was actually downloaded and the next run can resume from there
+            try:
+                os.truncate(self.path_part, written)
+            except OSError:
+                pass
+            if not isinstance(e, Exception):
+                # don't swallow a Ctrl-C
+                raise
+            print(f"Something went wrong while writing file to disk: {e}")
+            return None
+        return written
+
+    def hash_existing(self, path: pathlib.Path, sha1) -> None:
+        """
+        Update the hash with the contents of a file that is already on disk
+
+        :param path:    The file to hash
+        :param sha1:    The hash object to update
+        :return:        Nothing
+        """
+        buffer = memoryview(bytearray(1 << 20))
+        with open(path, "rb", buffering=0) as file:
+            while True:
+                size = file.readinto(buffer)
+                if not size:
+                    break
+                sha1.update(buffer[:size])
+
+    def verify(self, path: pathlib.Path, sha1, size: int, confirm: bool = False) -> bool:
+        """
+        Check that the file on disk is exactly as large as the data that was hashed, and
+         compare the hash of the downloaded file, with
+         the checksum published next to it on the Forge maven
+
+        :param path:    The downloaded file
+        :param sha1:    The hash of the downloaded file
+        :param size:    The amount of bytes that went into the hash
+        :param confirm: Only accept the file if the checksum could actually be compared
+        :return:        If the file is valid, or if there is no checksum to compare with and confirm is not set
+        """
+        # the hash only covers the bytes that went through it, anything else in the file would go unnoticed
+        if path.stat().st_size != size:
+            print(f"Size mismatch, expected {size} bytes but the file is {path.stat().st_size}, removing file")
+            return False
+
+        try:
+            response = self.session.get(f"{self.url_full}.sha1", timeout=10)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            if confirm:
+                print("No checksum available to confirm the file is complete, removing file")
+                return False
+            print("No checksum available, skipping verification")
+            return True
+
+        # the .sha1 file may also contain the file name after the hash
+        expected = response.text.split()[0].lower() if response.text.strip() else ""
+        if sha1.hexdigest() != expected:
+            print(f"Checksum mismatch, expected {expected} but got {sha1.hexdigest()}, removing file")
+            return False
+        print("Checksum verified")
+        return True
+
+
+def create_session() -> requests.Session:
+    """
+    Create a single requests session to be shared by all requests, so
+     connections to the same host are kept alive and reused
+     instead of paying for a new TCP + TLS handshake every time
+
+    :return:    The session
+    """
+    # 1 request plus 2 retries, so at most 3 attempts
+    retry_options = {
+        "total": 2,
+        "backoff_factor": 0.5,
+        "status_forcelist": [500, 503, 504],
+        "respect_retry_after_header": True
+    }
+    try:
+        # jitter keeps concurrent retries from all hitting the server at the same time
+        retry = Retry(backoff_jitter=0.25, **retry_options)
+    except TypeError:
+        # urllib3 < 2.0 does not support jitter
+        retry = Retry(**retry_options)
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(
+        {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:77.0) Gecko/20100101 Firefox/77.0"}
+    )
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+import gzip
+import hashlib
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import downloader  # noqa: E402
+from downloader import Forge, create_session  # noqa: E402
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def reset(self, payload: bytes) -> None:
+        """
+        Serve a new file, with a matching checksum and no quirks
+
+        :param payload: The contents of the remote file
+        :return:        Nothing
+        """
+        self.payload = payload
+        self.sha1 = hashlib.sha1(payload).hexdigest()
+        self.ignore_range = False
+        self.gzip = False
+        self.drop_after = None
+        self.failures = 0
+        self.ranges = []
+
+
+_sha1 = hashlib.sha1
+
+
+class _InterruptingSha1:
+    """
+    Stand-in for hashlib.sha1 which acts like a Ctrl-C after the first chunk
+    """
+    def __init__(self, *args):
+        self.sha1 = _sha1(*args)
+        self.calls = 0
+
+    def update(self, data) -> None:
+        self.calls += 1
+        if self.calls > 1:
+            raise KeyboardInterrupt
+        self.sha1.update(data)
+
+    def hexdigest(self) -> str:
+        return self.sha1.hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        """
+        Serve the payload, honouring Range requests unless told not to, and
+         the checksum of the payload at the same url with .sha1 appended
+
+        :return:    Nothing
+        """
+        server = self.server
+        if self.path.endswith(".sha1"):
+            if server.sha1 is None:
+                self.send_error(404)
+                return
+            body = f"{server.sha1}\n".encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        payload = server.payload
+        range_header = self.headers.get("Range")
+        server.ranges.append(range_header)
+
+        if server.failures:
+            server.failures -= 1
+            self.send_error(503)
+            return
+
+        if server.gzip:
+            # a server which ignores the identity encoding, and the range along with it
+            body = gzip.compress(payload)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        start = 0
+        if range_header and not server.ignore_range:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            if start >= len(payload):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(payload)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}")
+        else:
+            self.send_response(200)
+
+        body = payload[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if server.drop_after is not None:
+            # cut the connection halfway through, only once
+            body = body[:server.drop_after]
+            server.drop_after = None
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestForgeDownload(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _Server(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/forge-installer.jar"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.payload = os.urandom(3 * (1 << 20) + 123)
+        self.server.reset(self.payload)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = create_session()
+        # the test server is plain http, use the same adapter (and retries) as for https
+        self.session.mount("http://", self.session.get_adapter("https://"))
+        self.forge = Forge(self.session, pathlib.Path(self.tmp.name), "1.15.2", "31.2.0")
+        self.forge.url_full = self.url
+
+    def tearDown(self):
+        self.session.close()
+        self.tmp.cleanup()
+
+    def assertDownloaded(self):
+        self.assertEqual(self.forge.path_full.read_bytes(), self.payload)
+        self.assertFalse(self.forge.path_part.exists())
+
+    def test_fresh_download(self):
+        self.forge.download()
+        self.assertDownloaded()
+        self.assertEqual(self.server.ranges, [None])
+
+    def test_resume_partial_content(self):
+        self.forge.path_part.write_bytes(self.payload[:1 << 20])
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [f"bytes={1 << 20}-"])
+        self.assertDownloaded()
+
+    def test_resume_ignored_range_rewrites_file(self):
+        self.server.ignore_range = True
+        self.forge.path_part.write_bytes(self.payload[:1 << 20])
+        self.forge.download()
+        self.assertDownloaded()
+
+    def test_gzip_encoded_response(self):
+        # compressible, so each chunk decodes to more than was read off the wire
+        self.payload = os.urandom(64) * (1 << 16)
+        self.server.reset(self.payload)
+        self.server.gzip = True
+        self.forge.download()
+        self.assertDownloaded()
+
+    def test_partial_already_complete(self):
+        self.forge.path_part.write_bytes(self.payload)
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [f"bytes={len(self.payload)}-"])
+        self.assertDownloaded()
+
+    def test_zero_padded_partial_is_not_complete(self):
+        # what a killed run leaves behind after preallocating
+        self.forge.path_part.write_bytes(self.payload[:1 << 20] + b"\0" * (len(self.payload) - (1 << 20)))
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [f"bytes={len(self.payload)}-", None])
+        self.assertDownloaded()
+
+    def test_full_size_partial_without_checksum_is_downloaded_again(self):
+        self.server.sha1 = None
+        self.forge.path_part.write_bytes(b"\0" * len(self.payload))
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [f"bytes={len(self.payload)}-", None])
+        self.assertDownloaded()
+
+    def test_existing_jar_is_kept(self):
+        self.forge.path_full.write_bytes(self.payload)
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [])
+        self.assertDownloaded()
+
+    def test_corrupt_existing_jar_is_downloaded_again(self):
+        self.forge.path_full.write_bytes(b"\0" * len(self.payload))
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [None])
+        self.assertDownloaded()
+
+    def test_partial_larger_than_remote(self):
+        self.forge.path_part.write_bytes(self.payload + b"garbage")
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [f"bytes={len(self.payload) + 7}-", None])
+        self.assertDownloaded()
+
+    def test_interrupted_download_is_resumed(self):
+        self.server.drop_after = 1 << 20
+        self.forge.download()
+        self.assertEqual(len(self.server.ranges), 2)
+        # the retry resumes from what was actually written, not from any preallocated space
+        resumed_from = int(self.server.ranges[1].removeprefix("bytes=").rstrip("-"))
+        self.assertLessEqual(resumed_from, 1 << 20)
+        self.assertDownloaded()
+
+    def test_interrupted_download_without_retry_keeps_partial(self):
+        self.server.drop_after = 1 << 20
+        self.forge.download(retry=False)
+        self.assertFalse(self.forge.path_full.exists())
+        partial = self.forge.path_part.read_bytes()
+        # no zero filled preallocated space may be left behind
+        self.assertLessEqual(len(partial), 1 << 20)
+        self.assertEqual(partial, self.payload[:len(partial)])
+
+    def test_keyboard_interrupt_can_be_resumed(self):
+        with mock.patch.object(downloader.hashlib, "sha1", _InterruptingSha1):
+            with self.assertRaises(KeyboardInterrupt):
+                self.forge.download()
+        self.assertFalse(self.forge.path_full.exists())
+        partial = self.forge.path_part.read_bytes()
+        self.assertLess(len(partial), len(self.payload))
+        self.assertEqual(partial, self.payload[:len(partial)])
+
+        self.forge.download()
+        self.assertEqual(self.server.ranges[-1], f"bytes={len(partial)}-")
+        self.assertDownloaded()
+
+    def test_service_unavailable_is_retried(self):
+        self.server.failures = 2
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [None, None, None])
+        self.assertDownloaded()
+
+    def test_service_unavailable_gives_up_after_three_attempts(self):
+        self.server.failures = 5
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [None, None, None])
+        self.assertFalse(self.forge.path_full.exists())
+        self.assertFalse(self.forge.path_part.exists())
+
+    def test_checksum_mismatch_removes_file(self):
+        self.server.sha1 = hashlib.sha1(b"something else").hexdigest()
+        self.forge.download()
+        # downloaded, rejected, downloaded once more and rejected again
+        self.assertEqual(self.server.ranges, [None, None])
+        self.assertFalse(self.forge.path_full.exists())
+        self.assertFalse(self.forge.path_part.exists())
+
+    def test_corrupt_partial_is_downloaded_again(self):
+        self.forge.path_part.write_bytes(b"\0" * (1 << 20))
+        self.forge.download()
+        self.assertEqual(self.server.ranges, [f"bytes={1 << 20}-", None])
+        self.assertDownloaded()
+
+    def test_verify_checks_size_on_disk(self):
+        # a matching hash of the streamed bytes is not enough if the file holds anything else
+        self.forge.path_part.write_bytes(self.payload + b"\0" * 16)
+        self.assertFalse(self.forge.verify(self.forge.path_part, hashlib.sha1(self.payload), len(self.payload)))
+
+
+if __name__ == "__main__":
+    unittest.main()
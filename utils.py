@@ -2,6 +2,7 @@
 
 import os
 import pathlib
+import stat
 
 
 def get_full_path(path: str) -> pathlib.Path:
@@ -28,13 +29,16 @@ def is_valid_path(path: str, strict=False) -> bool:
     :param strict:  Don't allow path to already exist
     :return:        If the path is valid
     """
-    path = pathlib.Path(path)
-    if path.exists() and not strict:
-        if path.is_file():
-            return os.access(path, os.R_OK)  # read
-        elif path.is_dir():
-            return os.access(path, os.W_OK)  # write
-    elif not path.exists() and strict:
-        return True
-    else:
+    # A single stat gives us both existence and the file type,
+    #  where exists() followed by is_file()/is_dir() would each stat again
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return strict
+    if strict:
         return False
+    if stat.S_ISREG(mode):
+        return os.access(path, os.R_OK)  # read
+    elif stat.S_ISDIR(mode):
+        return os.access(path, os.W_OK)  # write
+    return False